@@ -26,9 +26,10 @@ setup(
     package_data={
         "steamfastlogin": ["icons/*.png"]
     },
-    install_requires=["appdirs", "keyring"],
+    install_requires=["appdirs", "cryptography", "keyring"],
     entry_points=dict(console_scripts=[
-        "steam-fast-login = steamfastlogin.cli:main"
+        "steam-fast-login = steamfastlogin.cli:main",
+        "steam-fast-login-migrate = steamfastlogin.cli:migrateMain",
     ]),
     classifiers=[
         "Development Status :: 5 - Production/Stable",
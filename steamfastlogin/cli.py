@@ -9,29 +9,34 @@
 # project is distributed without any warranty. Please see LICENSE.txt for the
 # full text of the license.
 
+import argparse
 import sys
+from getpass import getpass
+from typing import Optional
 from PyQt5.QtCore import QTranslator
 from PyQt5.QtWidgets import QApplication
 # Importing these DBus classes before instantiating QApplication seems to make
 # keyring interactions "Just Work(tm)"
 from PyQt5.QtDBus import QDBusConnection, QDBusInterface
 from steamfastlogin.controller import Controller, AppController
-from steamfastlogin.dirs import usersConfFile, settingsConfFile
+from steamfastlogin.credentials import BACKENDS, createCredentialBackend, migrateCredentials
+from steamfastlogin.dirs import usersConfFile, settingsConfFile, snapshotsDir
 from steamfastlogin.gui import MainWindowWidget, UserListWidget, ActionContainerWidget, UserInteraction
 from steamfastlogin.settings import Settings
+from steamfastlogin.snapshots import ConfigSnapshots
 from steamfastlogin.users import UserList
 from steamfastlogin.util import tr, ProcessRunner
 
 
 def guiInit():
-    userList = UserList(usersConfFile())
     settings = Settings(settingsConfFile())
 
     mainWindow = MainWindowWidget()
     mainWindow.setWindowTitle(tr("guiInit", "Steam Fast Login"))
 
     ui = UserInteraction(mainWindow)
-    controller = Controller(settings, userList, ui, ProcessRunner())
+    userList = UserList(usersConfFile(), createCredentialBackend(settings.getCredentialBackend(), ui.askVaultPassphrase))
+    controller = Controller(settings, userList, ui, ProcessRunner(), ConfigSnapshots(snapshotsDir()))
 
     userListWidget = UserListWidget()
     # Populate the list with any existing users
@@ -63,5 +68,43 @@ def main(argv=None):
     return app.exec_()
 
 
+def consoleVaultPassphrase(newVault: bool) -> Optional[str]:
+    if not newVault:
+        return getpass("Vault passphrase: ")
+    passphrase = getpass("New vault passphrase: ")
+    if passphrase != getpass("Confirm vault passphrase: "):
+        raise Exception("Passphrases do not match")
+    return passphrase
+
+
+def migrateMain(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    parser = argparse.ArgumentParser(prog=argv[0], description="Move saved passwords to a different password storage backend")
+    parser.add_argument("backend", choices=BACKENDS, help="the password storage backend to move to")
+    args = parser.parse_args(argv[1:])
+
+    settings = Settings(settingsConfFile())
+    oldBackend = settings.getCredentialBackend()
+    if args.backend == oldBackend:
+        print("Passwords are already stored in the {0} backend".format(oldBackend), file=sys.stderr)
+        return 1
+
+    userList = UserList(usersConfFile(), createCredentialBackend(oldBackend, consoleVaultPassphrase))
+    try:
+        newBackend = createCredentialBackend(args.backend, consoleVaultPassphrase)
+        migrateCredentials(userList.users, userList.credentialBackend, newBackend)
+    except Exception as e:
+        print("Error: {0}".format(e), file=sys.stderr)
+        return 1
+
+    rawSettings = settings.getRawSettings()
+    rawSettings["credential_backend"] = args.backend
+    settings.setRawSettings(rawSettings)
+    print("Moved {0} password(s) from {1} to {2}".format(len(userList.users), oldBackend, args.backend))
+    return 0
+
+
 if __name__ == "__main__":
     sys.exit(main())
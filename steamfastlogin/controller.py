@@ -7,18 +7,22 @@
 # project is distributed without any warranty. Please see LICENSE.txt for the
 # full text of the license.
 
+from pathlib import Path
+from steamfastlogin.credentials import createCredentialBackend, migrateCredentials
 from steamfastlogin.gui import UserListWidget, NewUserForm, SettingsForm, ActionContainerWidget, UserInteraction
 from steamfastlogin.settings import Settings
+from steamfastlogin.snapshots import ConfigSnapshots
 from steamfastlogin.users import UserList
-from steamfastlogin.util import tr, ProcessRunner
+from steamfastlogin.util import tr, isSteamRunning, ProcessRunner
 
 
 class Controller(object):
-    def __init__(self, settings: Settings, userList: UserList, ui: UserInteraction, processRunner: ProcessRunner):
+    def __init__(self, settings: Settings, userList: UserList, ui: UserInteraction, processRunner: ProcessRunner, snapshots: ConfigSnapshots):
         self._settings = settings
         self._userList = userList
         self._ui = ui
         self._processRunner = processRunner
+        self._snapshots = snapshots
 
     def addUser(self, name: str, password: str):
         try:
@@ -36,19 +40,68 @@ class Controller(object):
             except Exception as e:
                 self._ui.showError(tr("Controller", "Error"), str(e))
                 return False
+            # The user is already gone at this point, so failing to clean up
+            # their config snapshot mustn't keep them in the list.
+            try:
+                self._snapshots.delete(name)
+            except Exception as e:
+                self._ui.showWarning(tr("Controller", "Remove User"), tr("Controller", "User '{0}' was removed, but their saved Steam settings could not be deleted: {1}").format(name, str(e)))
             return True
         else:
             return False
 
     def loginUser(self, name: str):
         user = self._userList.getUser(name)
-        self._processRunner.runAsync(self._getSteamCommand(), ("-login", user.name, user.getPassword()))
+        try:
+            password = user.getPassword()
+        except Exception as e:
+            self._ui.showError(tr("Controller", "Error"), str(e))
+            return
+        if password is None:
+            self._ui.showError(tr("Controller", "Error"), tr("Controller", "No saved password found for user '{0}'").format(name))
+            return
+        try:
+            if self._settings.getConfigSnapshotsEnabled():
+                configDir = Path(self._settings.getSteamConfigPath()).expanduser()
+                # Steam writes its config when it exits. Switching while the
+                # previous account's session is still running would let it
+                # overwrite the config restored for the new account.
+                if self._snapshots.getCurrentAccount(configDir) != name and isSteamRunning():
+                    self._ui.showError(tr("Controller", "Error"), tr("Controller", "Steam is still running. Close Steam and wait for it to exit before switching accounts."))
+                    return
+                self._snapshots.switch(name, configDir)
+            else:
+                self._snapshots.clearCurrentAccount()
+        except Exception as e:
+            self._ui.showError(tr("Controller", "Error"), str(e))
+            return
+        self._processRunner.runAsync(self._getSteamCommand(), ("-login", user.name, password))
 
     def closeSteam(self):
         reply = self._ui.askQuestion(tr("Controller", "Close Steam"), tr("Controller", "Are you sure?"))
         if reply:
             self._processRunner.runAsync(self._getSteamCommand(), ("-shutdown",))
 
+    def switchCredentialBackend(self, backendName: str) -> bool:
+        try:
+            newBackend = createCredentialBackend(backendName, self._ui.askVaultPassphrase)
+        except Exception as e:
+            self._ui.showError(tr("Controller", "Error"), str(e))
+            return False
+        if self._userList.users:
+            # Saved passwords can't be re-entered from the UI, so switching
+            # without moving them would leave every existing user unusable.
+            reply = self._ui.askQuestion(tr("Controller", "Password Storage"), tr("Controller", "Saved passwords will be moved to the new password storage. Continue?"))
+            if not reply:
+                return False
+            try:
+                migrateCredentials(self._userList.users, self._userList.credentialBackend, newBackend)
+            except Exception as e:
+                self._ui.showError(tr("Controller", "Error"), str(e))
+                return False
+        self._userList.setCredentialBackend(newBackend)
+        return True
+
     def _getSteamCommand(self):
         command = self._settings.getSteamPath()
         if not command:
@@ -109,7 +162,13 @@ class AppController(object):
         self._controller.closeSteam()
 
     def _settingsSaveCallback(self, formData: dict):
+        oldBackend = self._settings.getCredentialBackend()
         self._settings.setRawSettings(formData)
+        newBackend = self._settings.getCredentialBackend()
+        if newBackend != oldBackend and not self._controller.switchCredentialBackend(newBackend):
+            # Keep using the old backend if switching failed or was cancelled
+            formData["credential_backend"] = oldBackend
+            self._settings.setRawSettings(formData)
 
     def settings(self, event):
         self._actions.disableActions()
@@ -0,0 +1,212 @@
+# SteamFastLogin - Login manager for Steam, allowing fast switching between accounts
+# Copyright (C) 2017 Matthew Gamble <git@matthewgamble.net>
+#
+# This project is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License Version 3 as published by the Free
+# Software Foundation. No other version currently applies to this project. This
+# project is distributed without any warranty. Please see LICENSE.txt for the
+# full text of the license.
+
+import fcntl
+import hashlib
+import json
+import keyring
+import os
+from base64 import b64decode, b64encode
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from steamfastlogin.dirs import vaultFile
+
+
+KEYRING_NAMESPACE = "steamfastlogin"
+
+BACKEND_KEYRING = "keyring"
+BACKEND_VAULT = "vault"
+BACKENDS = (BACKEND_KEYRING, BACKEND_VAULT)
+
+
+class CredentialBackend(object):
+    def setPassword(self, name: str, password: str):
+        raise NotImplementedError("Must implement setPassword()")
+
+    def getPassword(self, name: str) -> Optional[str]:
+        raise NotImplementedError("Must implement getPassword()")
+
+    def deletePassword(self, name: str):
+        raise NotImplementedError("Must implement deletePassword()")
+
+
+class KeyringCredentialBackend(CredentialBackend):
+    def setPassword(self, name: str, password: str):
+        keyring.set_password(KEYRING_NAMESPACE, name, password)
+
+    def getPassword(self, name: str) -> Optional[str]:
+        return keyring.get_password(KEYRING_NAMESPACE, name)
+
+    def deletePassword(self, name: str):
+        keyring.delete_password(KEYRING_NAMESPACE, name)
+
+
+# Stores passwords in a local file, each encrypted with AES-GCM under a key
+# derived from a passphrase using scrypt. The key is only derived once per
+# session. Entries are indexed by username, so a lookup only decrypts the one
+# entry it needs. Other processes (another window, or the migration tool) may
+# use the same vault, so every update is made under a lock against the latest
+# copy of the file.
+class VaultCredentialBackend(CredentialBackend):
+    _VERSION = 1
+    _CHECK_PLAINTEXT = b"steamfastlogin"
+    _CHECK_AAD = b"\x00check"
+
+    def __init__(self, vaultFile: Path, passphraseProvider: Callable[[bool], Optional[str]]):
+        self._vaultFile = vaultFile
+        self._lockFile = vaultFile.with_name(vaultFile.name + ".lock")
+        self._passphraseProvider = passphraseProvider
+        self._vault = None
+        self._vaultStat = None
+        self._cipher = None
+
+    @staticmethod
+    def _deriveKey(passphrase: str, kdf: dict) -> bytes:
+        return hashlib.scrypt(
+            passphrase.encode("utf-8"),
+            salt=b64decode(kdf["salt"]),
+            n=kdf["n"], r=kdf["r"], p=kdf["p"],
+            maxmem=128 * kdf["n"] * kdf["r"] * 2,
+            dklen=32
+        )
+
+    def _encrypt(self, plaintext: bytes, aad: bytes) -> str:
+        nonce = os.urandom(12)
+        return b64encode(nonce + self._cipher.encrypt(nonce, plaintext, aad)).decode("ascii")
+
+    def _decrypt(self, data: str, aad: bytes) -> bytes:
+        raw = b64decode(data)
+        return self._cipher.decrypt(raw[:12], raw[12:], aad)
+
+    @contextmanager
+    def _locked(self):
+        fd = os.open(str(self._lockFile), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _statVault(self):
+        st = os.stat(str(self._vaultFile))
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _readVault(self) -> dict:
+        vaultStat = self._statVault()
+        vault = json.loads(self._vaultFile.read_text(encoding="utf-8"))
+        if vault.get("version") != self._VERSION:
+            raise Exception("Unsupported vault version in {0}".format(self._vaultFile))
+        self._vaultStat = vaultStat
+        return vault
+
+    def _refresh(self):
+        # The vault is always replaced rather than modified in place, so any
+        # change made by another process shows up in the file's stat.
+        if self._statVault() == self._vaultStat:
+            return
+        vault = self._readVault()
+        if vault["kdf"] != self._vault["kdf"]:
+            raise Exception("The password vault was replaced by another process")
+        self._vault = vault
+
+    def _unlock(self):
+        if self._cipher is not None:
+            return
+
+        newVault = not self._vaultFile.exists()
+        if newVault:
+            vault = {
+                "version": self._VERSION,
+                "kdf": {"salt": b64encode(os.urandom(16)).decode("ascii"), "n": 2 ** 15, "r": 8, "p": 1},
+                "entries": {},
+            }
+        else:
+            vault = self._readVault()
+
+        passphrase = self._passphraseProvider(newVault)
+        if not passphrase:
+            raise Exception("The password vault is locked")
+
+        cipher = AESGCM(self._deriveKey(passphrase, vault["kdf"]))
+        if newVault:
+            with self._locked():
+                if self._vaultFile.exists():
+                    raise Exception("The password vault was created by another process, please try again")
+                self._cipher = cipher
+                vault["check"] = self._encrypt(self._CHECK_PLAINTEXT, self._CHECK_AAD)
+                self._vault = vault
+                self._saveVault()
+        else:
+            self._cipher = cipher
+            try:
+                self._decrypt(vault["check"], self._CHECK_AAD)
+            except InvalidTag:
+                self._cipher = None
+                raise Exception("Incorrect vault passphrase")
+            self._vault = vault
+
+    def _saveVault(self):
+        # Must be called while holding the lock. Write to a temporary file and
+        # rename it over the vault, so a crash never leaves a partially written
+        # vault behind.
+        tmpFile = self._vaultFile.with_name(self._vaultFile.name + ".tmp")
+        fd = os.open(str(tmpFile), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._vault))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(str(tmpFile), str(self._vaultFile))
+        self._vaultStat = self._statVault()
+
+    def setPassword(self, name: str, password: str):
+        self._unlock()
+        with self._locked():
+            self._refresh()
+            self._vault["entries"][name] = self._encrypt(password.encode("utf-8"), name.encode("utf-8"))
+            self._saveVault()
+
+    def getPassword(self, name: str) -> Optional[str]:
+        self._unlock()
+        self._refresh()
+        entry = self._vault["entries"].get(name)
+        if entry is None:
+            return None
+        return self._decrypt(entry, name.encode("utf-8")).decode("utf-8")
+
+    def deletePassword(self, name: str):
+        self._unlock()
+        with self._locked():
+            self._refresh()
+            if self._vault["entries"].pop(name, None) is not None:
+                self._saveVault()
+
+
+def createCredentialBackend(name: str, passphraseProvider: Callable[[bool], Optional[str]]) -> CredentialBackend:
+    if name == BACKEND_KEYRING:
+        return KeyringCredentialBackend()
+    elif name == BACKEND_VAULT:
+        return VaultCredentialBackend(vaultFile(), passphraseProvider)
+    else:
+        raise Exception("Unknown credential backend '{0}'".format(name))
+
+
+def migrateCredentials(names: Iterable[str], source: CredentialBackend, target: CredentialBackend):
+    # Copy everything before deleting anything, so a failure part way through
+    # leaves every password available in the source backend.
+    names = list(names)
+    for name in names:
+        password = source.getPassword(name)
+        if password is None:
+            raise Exception("No saved password found for user {0}".format(name))
+        target.setPassword(name, password)
+    for name in names:
+        source.deletePassword(name)
@@ -20,6 +20,12 @@ def confDir() -> Path:
     return cdir
 
 
+def dataDir() -> Path:
+    ddir = Path(dirs.user_data_dir)
+    ddir.mkdir(mode=0o750, parents=True, exist_ok=True)
+    return ddir
+
+
 def usersConfFile() -> Path:
     cdir = confDir()
     return cdir / "users.json"
@@ -28,3 +34,13 @@ def usersConfFile() -> Path:
 def settingsConfFile() -> Path:
     cdir = confDir()
     return cdir / "settings.json"
+
+
+def vaultFile() -> Path:
+    cdir = confDir()
+    return cdir / "vault.json"
+
+
+def snapshotsDir() -> Path:
+    ddir = dataDir()
+    return ddir / "snapshots"
@@ -8,14 +8,16 @@
 # full text of the license.
 
 from os import path
-from typing import Callable
+from typing import Callable, Optional
 from PyQt5.QtCore import Qt, QSize, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtWidgets import QDesktopWidget, QMainWindow, QWidget
 from PyQt5.QtWidgets import QLayout, QFormLayout, QHBoxLayout, QVBoxLayout
 from PyQt5.QtWidgets import QListWidget, QListWidgetItem
-from PyQt5.QtWidgets import QPushButton, QLabel, QLineEdit
-from PyQt5.QtWidgets import QMessageBox, QFileDialog
+from PyQt5.QtWidgets import QPushButton, QLabel, QLineEdit, QComboBox, QCheckBox
+from PyQt5.QtWidgets import QMessageBox, QFileDialog, QInputDialog
+from steamfastlogin.credentials import BACKEND_KEYRING, BACKEND_VAULT
+from steamfastlogin.snapshots import DEFAULT_STEAM_CONFIG_PATH
 from steamfastlogin.util import tr
 
 
@@ -195,6 +197,12 @@ class SettingsForm(AbstractForm):
         self._fields = {}
 
         self._addFilePickerField("steam_path", tr("SettingsForm", "Path to Steam"), "Steam (*steam*);;All Files(*)")
+        self._addChoiceField("credential_backend", tr("SettingsForm", "Password storage"), (
+            (BACKEND_KEYRING, tr("SettingsForm", "System keyring")),
+            (BACKEND_VAULT, tr("SettingsForm", "Encrypted vault file")),
+        ))
+        self._addCheckboxField("config_snapshots", tr("SettingsForm", "Separate Steam settings per account"))
+        self._addDirectoryPickerField("steam_config_path", tr("SettingsForm", "Steam config directory"), DEFAULT_STEAM_CONFIG_PATH)
 
         self._grid.addLayout(self._form)
 
@@ -215,6 +223,18 @@ class SettingsForm(AbstractForm):
         self._resetGeometry()
 
     def _addFilePickerField(self, code: str, label: str, fileFilter: str):
+        def chooseFile():
+            filename, _ = QFileDialog.getOpenFileName(self, label, path.expanduser("~"), fileFilter)
+            return filename
+        self._addPickerField(code, label, chooseFile)
+
+    def _addDirectoryPickerField(self, code: str, label: str, placeholder: str):
+        def chooseDirectory():
+            return QFileDialog.getExistingDirectory(self, label, path.expanduser("~"))
+        fieldWidget = self._addPickerField(code, label, chooseDirectory)
+        fieldWidget.setPlaceholderText(placeholder)
+
+    def _addPickerField(self, code: str, label: str, chooser: Callable[[], str]) -> QLineEdit:
         labelWidget = QLabel(label)
         labelWidget.setFont(self._font)
         filePicker = QHBoxLayout()
@@ -225,13 +245,30 @@ class SettingsForm(AbstractForm):
         fileDialogOpener.setFont(self._font)
         fileDialogOpener.setToolTip(tr("SettingsForm", "Pick"))
         filePicker.addWidget(fileDialogOpener)
-        def chooseFile(event):
-            filename, _ = QFileDialog.getOpenFileName(self, label, path.expanduser("~"), fileFilter)
+        def choose(event):
+            filename = chooser()
             if filename:
                 fieldWidget.setText(filename)
-        fileDialogOpener.clicked.connect(chooseFile)
+        fileDialogOpener.clicked.connect(choose)
         self._form.addRow(labelWidget, filePicker)
         self._fields[code] = fieldWidget
+        return fieldWidget
+
+    def _addChoiceField(self, code: str, label: str, choices: tuple):
+        labelWidget = QLabel(label)
+        labelWidget.setFont(self._font)
+        fieldWidget = QComboBox()
+        fieldWidget.setFont(self._font)
+        for value, choiceLabel in choices:
+            fieldWidget.addItem(choiceLabel, value)
+        self._form.addRow(labelWidget, fieldWidget)
+        self._fields[code] = fieldWidget
+
+    def _addCheckboxField(self, code: str, label: str):
+        fieldWidget = QCheckBox(label)
+        fieldWidget.setFont(self._font)
+        self._form.addRow(fieldWidget)
+        self._fields[code] = fieldWidget
 
     def _resetGeometry(self):
         self.resize(450, 150)
@@ -240,13 +277,25 @@ class SettingsForm(AbstractForm):
     def gatherFormData(self) -> dict:
         data = {}
         for code, field in self._fields.items():
-            data[code] = field.text()
+            if isinstance(field, QComboBox):
+                data[code] = field.currentData()
+            elif isinstance(field, QCheckBox):
+                data[code] = field.isChecked()
+            else:
+                data[code] = field.text()
         return data
 
     def setFormData(self, formData: dict):
         for code, field in self._fields.items():
             if code in formData:
-                field.setText(formData[code])
+                if isinstance(field, QComboBox):
+                    index = field.findData(formData[code])
+                    if index >= 0:
+                        field.setCurrentIndex(index)
+                elif isinstance(field, QCheckBox):
+                    field.setChecked(bool(formData[code]))
+                else:
+                    field.setText(formData[code])
 
     def submitForm(self):
         formData = self.gatherFormData()
@@ -303,3 +352,24 @@ class UserInteraction(object):
     def askQuestion(self, title: str, message: str) -> bool:
         reply = QMessageBox.question(self._container, title, message, QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
         return reply == QMessageBox.Yes
+
+    def askPassword(self, title: str, message: str) -> Optional[str]:
+        password, ok = QInputDialog.getText(self._container, title, message, QLineEdit.Password)
+        if ok:
+            return password
+        else:
+            return None
+
+    def askVaultPassphrase(self, newVault: bool) -> Optional[str]:
+        title = tr("UserInteraction", "Password Vault")
+        if not newVault:
+            return self.askPassword(title, tr("UserInteraction", "Enter the passphrase for the password vault"))
+
+        # A mistyped passphrase would leave the new vault unreadable, so make
+        # sure it's entered the same way twice.
+        passphrase = self.askPassword(title, tr("UserInteraction", "Choose a passphrase for the new password vault"))
+        if not passphrase:
+            return None
+        if passphrase != self.askPassword(title, tr("UserInteraction", "Confirm the passphrase for the new password vault")):
+            raise Exception(tr("UserInteraction", "Passphrases do not match"))
+        return passphrase
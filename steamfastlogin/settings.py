@@ -8,6 +8,8 @@
 # full text of the license.
 
 import json
+from steamfastlogin.credentials import BACKEND_KEYRING
+from steamfastlogin.snapshots import DEFAULT_STEAM_CONFIG_PATH
 from pathlib import Path
 
 
@@ -37,3 +39,21 @@ class Settings(object):
             return self._settings["steam_path"]
         else:
             return ""
+
+    def getCredentialBackend(self) -> str:
+        if self._settings.get("credential_backend"):
+            return self._settings["credential_backend"]
+        else:
+            return BACKEND_KEYRING
+
+    def getConfigSnapshotsEnabled(self) -> bool:
+        if "config_snapshots" in self._settings:
+            return bool(self._settings["config_snapshots"])
+        else:
+            return False
+
+    def getSteamConfigPath(self) -> str:
+        if self._settings.get("steam_config_path"):
+            return self._settings["steam_config_path"]
+        else:
+            return DEFAULT_STEAM_CONFIG_PATH
@@ -0,0 +1,227 @@
+# SteamFastLogin - Login manager for Steam, allowing fast switching between accounts
+# Copyright (C) 2017 Matthew Gamble <git@matthewgamble.net>
+#
+# This project is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License Version 3 as published by the Free
+# Software Foundation. No other version currently applies to this project. This
+# project is distributed without any warranty. Please see LICENSE.txt for the
+# full text of the license.
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+from pathlib import Path
+from typing import Optional
+
+
+DEFAULT_STEAM_CONFIG_PATH = "~/.steam/steam/config"
+
+# From linux/fs.h
+_FICLONE = 0x40049409
+
+
+def cloneFile(source: Path, target: Path):
+    # Prefer a reflink, which shares the underlying blocks copy-on-write and is
+    # close to free on filesystems that support it (btrfs, XFS). Otherwise fall
+    # back to a regular copy.
+    with source.open("rb") as src, target.open("wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+        shutil.copyfileobj(src, dst)
+
+
+def hashFile(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _writeAtomic(path: Path, content: str):
+    tmpFile = path.with_name(path.name + ".tmp")
+    tmpFile.write_text(content, encoding="utf-8")
+    os.replace(str(tmpFile), str(path))
+
+
+# Keeps a copy of the Steam config directory for each account. File contents
+# are stored once in a content-addressed object store shared by all accounts,
+# and each account has a manifest mapping relative paths to object hashes.
+# Manifests also record each file's size and mtime, so files which haven't
+# changed are neither rehashed when snapshotting nor copied when restoring.
+#
+# Files are never hardlinked between the store and the live config directory.
+# Steam may rewrite its config files in place, which would silently change the
+# stored object for every account sharing it.
+class ConfigSnapshots(object):
+    def __init__(self, storeDir: Path):
+        self._storeDir = storeDir
+        self._objectsDir = storeDir / "objects"
+        self._accountsDir = storeDir / "accounts"
+        self._currentFile = storeDir / "current"
+
+    def _objectPath(self, fileHash: str) -> Path:
+        return self._objectsDir / fileHash[:2] / fileHash
+
+    def _manifestPath(self, name: str) -> Path:
+        return self._accountsDir / "{0}.json".format(hashlib.sha256(name.encode("utf-8")).hexdigest())
+
+    def _loadManifest(self, name: str) -> Optional[dict]:
+        manifestPath = self._manifestPath(name)
+        if manifestPath.exists():
+            return json.loads(manifestPath.read_text(encoding="utf-8"))
+        else:
+            return None
+
+    def _saveManifest(self, name: str, manifest: dict):
+        self._accountsDir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _writeAtomic(self._manifestPath(name), json.dumps(manifest))
+
+    def _storeObject(self, source: Path, fileHash: str):
+        objectPath = self._objectPath(fileHash)
+        if objectPath.exists():
+            return
+        objectPath.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmpFile = objectPath.with_name(objectPath.name + ".tmp")
+        cloneFile(source, tmpFile)
+        # The file may have changed since it was hashed
+        if hashFile(tmpFile) != fileHash:
+            tmpFile.unlink()
+            raise Exception("{0} changed while taking a snapshot".format(source))
+        tmpFile.chmod(0o400)
+        os.replace(str(tmpFile), str(objectPath))
+
+    def getCurrentAccount(self, configDir: Path) -> Optional[str]:
+        # The live config only belongs to the recorded account if it was
+        # recorded against the same config directory.
+        if not self._currentFile.exists():
+            return None
+        current = json.loads(self._currentFile.read_text(encoding="utf-8"))
+        if current["configDir"] != str(configDir):
+            return None
+        return current["account"]
+
+    def _setCurrentAccount(self, name: str, configDir: Path):
+        self._storeDir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _writeAtomic(self._currentFile, json.dumps({"account": name, "configDir": str(configDir)}))
+
+    def clearCurrentAccount(self):
+        # Called whenever the live config can no longer be attributed to any
+        # account, such as after a login made without switching snapshots.
+        if self._currentFile.exists():
+            self._currentFile.unlink()
+
+    def snapshot(self, name: str, configDir: Path):
+        oldFiles = {}
+        oldManifest = self._loadManifest(name)
+        if oldManifest is not None:
+            oldFiles = oldManifest["files"]
+
+        files = {}
+        for dirPath, dirNames, fileNames in os.walk(str(configDir)):
+            for fileName in fileNames:
+                livePath = Path(dirPath) / fileName
+                relPath = livePath.relative_to(configDir).as_posix()
+                st = livePath.lstat()
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                entry = oldFiles.get(relPath)
+                if entry is None or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+                    fileHash = hashFile(livePath)
+                    self._storeObject(livePath, fileHash)
+                    entry = {"hash": fileHash, "size": st.st_size, "mtime": st.st_mtime_ns, "mode": st.st_mode & 0o777}
+                files[relPath] = entry
+
+        self._saveManifest(name, {"files": files})
+
+        # Steam rewrites some files every session, so drop the objects this
+        # account no longer uses unless another account still needs them.
+        dropped = set(entry["hash"] for entry in oldFiles.values())
+        dropped.difference_update(entry["hash"] for entry in files.values())
+        if dropped:
+            self._collectGarbage(dropped)
+
+    def restore(self, name: str, configDir: Path) -> bool:
+        manifest = self._loadManifest(name)
+        if manifest is None:
+            return False
+        files = manifest["files"]
+
+        for dirPath, dirNames, fileNames in os.walk(str(configDir)):
+            for fileName in fileNames:
+                livePath = Path(dirPath) / fileName
+                if not stat.S_ISREG(livePath.lstat().st_mode):
+                    continue
+                if livePath.relative_to(configDir).as_posix() not in files:
+                    livePath.unlink()
+
+        for relPath, entry in files.items():
+            livePath = configDir / relPath
+            try:
+                st = livePath.lstat()
+                if stat.S_ISREG(st.st_mode) and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"]:
+                    continue
+            except FileNotFoundError:
+                pass
+            livePath.parent.mkdir(parents=True, exist_ok=True)
+            tmpFile = livePath.with_name(livePath.name + ".steamfastlogin.tmp")
+            try:
+                cloneFile(self._objectPath(entry["hash"]), tmpFile)
+                tmpFile.chmod(entry["mode"])
+                os.utime(str(tmpFile), ns=(entry["mtime"], entry["mtime"]))
+                os.replace(str(tmpFile), str(livePath))
+            except Exception:
+                # Don't leave the partial copy behind to be mistaken for a
+                # real config file by a later snapshot
+                if tmpFile.exists():
+                    tmpFile.unlink()
+                raise
+        return True
+
+    def switch(self, name: str, configDir: Path):
+        current = self.getCurrentAccount(configDir)
+        if current == name:
+            return
+        configDir.mkdir(parents=True, exist_ok=True)
+        if current is not None:
+            self.snapshot(current, configDir)
+        # Once restoring starts, the live config belongs to no account until it
+        # completes. If it fails part way, the next switch mustn't save the
+        # partially restored config over the previous account's snapshot.
+        self.clearCurrentAccount()
+        self.restore(name, configDir)
+        self._setCurrentAccount(name, configDir)
+
+    def delete(self, name: str):
+        manifestPath = self._manifestPath(name)
+        if manifestPath.exists():
+            manifestPath.unlink()
+        if self._currentFile.exists():
+            current = json.loads(self._currentFile.read_text(encoding="utf-8"))
+            if current["account"] == name:
+                self._currentFile.unlink()
+        self._collectGarbage()
+
+    def _collectGarbage(self, candidates: Optional[set] = None):
+        # Only the candidate objects are considered for removal, or every
+        # object if no candidates are given.
+        if not self._objectsDir.exists():
+            return
+        referenced = set()
+        if self._accountsDir.exists():
+            for manifestPath in self._accountsDir.glob("*.json"):
+                manifest = json.loads(manifestPath.read_text(encoding="utf-8"))
+                referenced.update(entry["hash"] for entry in manifest["files"].values())
+        if candidates is None:
+            objectPaths = self._objectsDir.glob("*/*")
+        else:
+            objectPaths = [self._objectPath(fileHash) for fileHash in candidates]
+        for objectPath in objectPaths:
+            if objectPath.name not in referenced and objectPath.exists():
+                objectPath.unlink()
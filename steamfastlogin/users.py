@@ -8,16 +8,14 @@
 # full text of the license.
 
 import json
-import keyring
 from pathlib import Path
-
-
-KEYRING_NAMESPACE = "steamfastlogin"
+from steamfastlogin.credentials import CredentialBackend
 
 
 class UserList(object):
-    def __init__(self, confFile: Path):
+    def __init__(self, confFile: Path, credentialBackend: CredentialBackend):
         self._confFile = confFile
+        self._credentialBackend = credentialBackend
         self._loadUsers()
 
     def _loadUsers(self):
@@ -33,17 +31,24 @@ class UserList(object):
     def users(self):
         return self._usernames
 
+    @property
+    def credentialBackend(self) -> CredentialBackend:
+        return self._credentialBackend
+
+    def setCredentialBackend(self, credentialBackend: CredentialBackend):
+        self._credentialBackend = credentialBackend
+
     def addUser(self, name: str, password: str):
         if name in self._usernames:
             raise Exception("User {0} has already been added".format(name))
-        user = User(name)
+        user = User(name, self._credentialBackend)
         user.setPassword(password)
         self._usernames.append(name)
         self._saveUsers()
 
     def removeUser(self, name: str) -> bool:
         if name in self._usernames:
-            user = User(name)
+            user = User(name, self._credentialBackend)
             user.deletePassword()
             self._usernames.remove(name)
             self._saveUsers()
@@ -51,18 +56,19 @@ class UserList(object):
         return False
 
     def getUser(self, name: str):
-        return User(name)
+        return User(name, self._credentialBackend)
 
 
 class User(object):
-    def __init__(self, name: str):
+    def __init__(self, name: str, credentialBackend: CredentialBackend):
         self.name = name
+        self._credentialBackend = credentialBackend
 
     def setPassword(self, password: str):
-        keyring.set_password(KEYRING_NAMESPACE, self.name, password)
+        self._credentialBackend.setPassword(self.name, password)
 
     def getPassword(self) -> str:
-        return keyring.get_password(KEYRING_NAMESPACE, self.name)
+        return self._credentialBackend.getPassword(self.name)
 
     def deletePassword(self):
-        keyring.delete_password(KEYRING_NAMESPACE, self.name)
+        self._credentialBackend.deletePassword(self.name)
@@ -7,14 +7,31 @@
 # project is distributed without any warranty. Please see LICENSE.txt for the
 # full text of the license.
 
+from pathlib import Path
 from typing import Optional
 from PyQt5.QtCore import QCoreApplication, QProcess
 
 
+STEAM_PID_FILE = "~/.steam/steam.pid"
+
+
 def tr(ctx: str, msg: str, disambiguation: Optional[str]=None) -> str:
     return QCoreApplication.translate(ctx, msg, disambiguation)
 
 
+def isSteamRunning() -> bool:
+    # Steam leaves its pid file behind when it exits, so check that the pid
+    # still belongs to a live Steam process rather than a reused pid.
+    try:
+        pid = int(Path(STEAM_PID_FILE).expanduser().read_text().strip())
+        procDir = Path("/proc/{0}".format(pid))
+        status = (procDir / "status").read_text()
+        comm = (procDir / "comm").read_text()
+    except (OSError, ValueError):
+        return False
+    return "\nState:\tZ" not in status and "steam" in comm.lower()
+
+
 class ProcessRunner(object):
     def runAsync(self, command: str, args: tuple):
         QProcess.startDetached(command, args)
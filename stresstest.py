@@ -0,0 +1,364 @@
+#!/usr/bin/python3
+
+# SteamFastLogin - Login manager for Steam, allowing fast switching between accounts
+# Copyright (C) 2017 Matthew Gamble <git@matthewgamble.net>
+#
+# This project is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License Version 3 as published by the Free
+# Software Foundation. No other version currently applies to this project. This
+# project is distributed without any warranty. Please see LICENSE.txt for the
+# full text of the license.
+
+# Stress harness which drives Controller and AppController through thousands of
+# login/shutdown/switch cycles. It runs entirely locally: Steam is replaced by a
+# fake executable, the keyring by an in-memory backend, and Qt runs offscreen.
+
+import argparse
+import gc
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import keyring
+from keyring.backend import KeyringBackend
+from keyring.errors import PasswordDeleteError
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+from steamfastlogin.controller import Controller, AppController
+from steamfastlogin.credentials import KeyringCredentialBackend
+from steamfastlogin.gui import MainWindowWidget, UserListWidget, ActionContainerWidget, UserInteraction
+from steamfastlogin.settings import Settings
+from steamfastlogin.snapshots import ConfigSnapshots
+from steamfastlogin.users import UserList
+from steamfastlogin.util import ProcessRunner
+
+
+FAKE_STEAM = """#!{python}
+import os
+import sys
+import time
+
+stateDir = os.environ["FAKE_STEAM_STATE_DIR"]
+seq = os.environ.get("FAKE_STEAM_SEQ", "unknown")
+
+def writeFile(name, content):
+    target = os.path.join(stateDir, name)
+    with open(target + ".tmp", "w") as f:
+        f.write(content)
+    os.replace(target + ".tmp", target)
+
+writeFile(seq + ".pid", str(os.getpid()))
+# Like the real Steam, leave a pid file behind which outlives the process
+steamHome = os.path.join(os.environ["HOME"], ".steam")
+os.makedirs(steamHome, exist_ok=True)
+with open(os.path.join(steamHome, "steam.pid"), "w") as f:
+    f.write(str(os.getpid()))
+args = sys.argv[1:]
+if len(args) == 3 and args[0] == "-login":
+    time.sleep(float(os.environ.get("FAKE_STEAM_LOGIN_DELAY", "0")))
+    writeFile("state", args[1])
+    configDir = os.environ.get("FAKE_STEAM_CONFIG_DIR")
+    if configDir:
+        with open(os.path.join(configDir, "history"), "a") as f:
+            f.write(args[1] + "\\n")
+    writeFile(seq + ".done", "login\\n{{0}}\\n{{1}}".format(args[1], args[2]))
+elif args == ["-shutdown"]:
+    time.sleep(float(os.environ.get("FAKE_STEAM_SHUTDOWN_DELAY", "0")))
+    writeFile("state", "")
+    writeFile(seq + ".done", "shutdown")
+else:
+    writeFile(seq + ".done", "invalid\\n" + " ".join(args))
+    sys.exit(1)
+"""
+
+
+class MemoryKeyring(KeyringBackend):
+    priority = 1
+
+    def __init__(self):
+        super().__init__()
+        self._passwords = {}
+
+    def set_password(self, service: str, username: str, password: str):
+        self._passwords[(service, username)] = password
+
+    def get_password(self, service: str, username: str):
+        return self._passwords.get((service, username))
+
+    def delete_password(self, service: str, username: str):
+        try:
+            del self._passwords[(service, username)]
+        except KeyError:
+            raise PasswordDeleteError("Password not found")
+
+
+class HeadlessUserInteraction(UserInteraction):
+    def __init__(self, containerWidget):
+        super().__init__(containerWidget)
+        self.messages = []
+
+    def showInformation(self, title: str, message: str):
+        self.messages.append(("information", title, message))
+
+    def showWarning(self, title: str, message: str):
+        self.messages.append(("warning", title, message))
+
+    def showError(self, title: str, message: str):
+        self.messages.append(("error", title, message))
+
+    def askQuestion(self, title: str, message: str) -> bool:
+        return True
+
+
+class StressHarness(object):
+    def __init__(self, workDir: Path, args):
+        self._workDir = workDir
+        self._args = args
+        self._stateDir = workDir / "state"
+        self._stateDir.mkdir()
+        self._seq = 0
+        # End-to-end latency is dominated by starting the fake Steam, so the
+        # time spent in the app's own code is recorded separately.
+        self._latencies = {"controller-login": [], "appcontroller-login": [], "shutdown": []}
+        self._appLatencies = {kind: [] for kind in self._latencies}
+        self._failures = []
+        self._pids = []
+        self._samples = []
+        self._loginCounts = {}
+
+        # Keep a real Steam installation's pid file out of the picture
+        os.environ["HOME"] = str(workDir)
+        os.environ["FAKE_STEAM_STATE_DIR"] = str(self._stateDir)
+        os.environ["FAKE_STEAM_LOGIN_DELAY"] = str(args.login_delay)
+        os.environ["FAKE_STEAM_SHUTDOWN_DELAY"] = str(args.shutdown_delay)
+        self._configDir = workDir / "config"
+        if args.snapshots:
+            os.environ["FAKE_STEAM_CONFIG_DIR"] = str(self._configDir)
+
+    def _writeFakeSteam(self) -> Path:
+        steamPath = self._workDir / "steam"
+        steamPath.write_text(FAKE_STEAM.format(python=sys.executable), encoding="utf-8")
+        steamPath.chmod(steamPath.stat().st_mode | stat.S_IXUSR)
+        return steamPath
+
+    def setUp(self):
+        settings = Settings(self._workDir / "settings.json")
+        settings.setRawSettings({
+            "steam_path": str(self._writeFakeSteam()),
+            "config_snapshots": self._args.snapshots,
+            "steam_config_path": str(self._configDir),
+        })
+        userList = UserList(self._workDir / "users.json", KeyringCredentialBackend())
+
+        self._mainWindow = MainWindowWidget()
+        self._ui = HeadlessUserInteraction(self._mainWindow)
+        self._controller = Controller(settings, userList, self._ui, ProcessRunner(), ConfigSnapshots(self._workDir / "snapshots"))
+
+        self._passwords = {}
+        for x in range(self._args.accounts):
+            username = "stressuser{0}".format(x)
+            password = "password{0}".format(x)
+            if not self._controller.addUser(username, password):
+                raise Exception("Unable to add user {0}".format(username))
+            self._passwords[username] = password
+
+        self._userListWidget = UserListWidget()
+        for username in userList.users:
+            self._userListWidget.addItem(username)
+        self._userListWidget.userActivated.connect(self._controller.loginUser)
+        self._mainWindow.addWidget_(self._userListWidget)
+
+        actionContainer = ActionContainerWidget()
+        self._appController = AppController(settings, self._ui, self._userListWidget, actionContainer, self._controller)
+        self._mainWindow.addWidget_(actionContainer)
+        self._mainWindow.show()
+
+    def _waitFor(self, seq: int):
+        donePath = self._stateDir / "{0}.done".format(seq)
+        deadline = time.monotonic() + self._args.timeout
+        while not donePath.exists():
+            if time.monotonic() > deadline:
+                return None
+            QApplication.processEvents()
+            time.sleep(0.0005)
+        return donePath.read_text(encoding="utf-8")
+
+    def _waitForExit(self, pid: int):
+        deadline = time.monotonic() + self._args.timeout
+        while time.monotonic() < deadline:
+            try:
+                status = Path("/proc/{0}/status".format(pid)).read_text()
+            except (FileNotFoundError, ProcessLookupError):
+                return
+            if "\nState:\tZ" in status:
+                return
+            time.sleep(0.0005)
+
+    def _runOp(self, kind: str, trigger, expected: str):
+        self._seq += 1
+        seq = self._seq
+        os.environ["FAKE_STEAM_SEQ"] = str(seq)
+        start = time.perf_counter()
+        trigger()
+        appElapsed = time.perf_counter() - start
+        result = self._waitFor(seq)
+        elapsed = time.perf_counter() - start
+
+        pidPath = self._stateDir / "{0}.pid".format(seq)
+        if pidPath.exists():
+            pid = int(pidPath.read_text(encoding="utf-8"))
+            self._pids.append(pid)
+            # Like a user waiting for Steam to close, so switching isn't refused
+            self._waitForExit(pid)
+        if result is None:
+            self._failures.append((seq, kind, "timed out"))
+            return
+        if result != expected:
+            self._failures.append((seq, kind, "unexpected result {0!r}".format(result)))
+            return
+        if self._args.snapshots and kind != "shutdown":
+            self._checkSnapshot(seq, kind, result.split("\n")[1])
+        self._latencies[kind].append(elapsed)
+        self._appLatencies[kind].append(appElapsed)
+
+    def _checkSnapshot(self, seq: int, kind: str, username: str):
+        # The fake Steam appends each login to a history file in the config dir.
+        # If each account's config is restored correctly, the history ends with
+        # every login of the current account and nothing from other accounts.
+        self._loginCounts[username] = self._loginCounts.get(username, 0) + 1
+        history = (self._configDir / "history").read_text(encoding="utf-8").split()
+        run = 0
+        while run < len(history) and history[-1 - run] == username:
+            run += 1
+        if run != self._loginCounts[username]:
+            self._failures.append((seq, kind, "expected {0} logins in restored config for {1}, found {2}".format(
+                self._loginCounts[username], username, run)))
+
+    def _selectUser(self, username: str):
+        item = self._userListWidget.findItems(username, Qt.MatchExactly)[0]
+        self._userListWidget.setCurrentItem(item)
+        item.setSelected(True)
+
+    def _sample(self, cycle: int):
+        gc.collect()
+        rssPages = int(Path("/proc/self/statm").read_text().split()[1])
+        fdCount = len(os.listdir("/proc/self/fd"))
+        self._samples.append((cycle, time.perf_counter(), rssPages * os.sysconf("SC_PAGE_SIZE"), fdCount))
+
+    def run(self):
+        usernames = sorted(self._passwords)
+        self._startTime = time.perf_counter()
+        self._sample(0)
+        for cycle in range(1, self._args.cycles + 1):
+            username = usernames[cycle % len(usernames)]
+            expected = "login\n{0}\n{1}".format(username, self._passwords[username])
+            if cycle % 2:
+                self._runOp("controller-login", lambda: self._userListWidget.userActivated.emit(username), expected)
+            else:
+                self._selectUser(username)
+                self._runOp("appcontroller-login", lambda: self._appController.login(None), expected)
+
+            if self._args.shutdown_every and cycle % self._args.shutdown_every == 0:
+                self._runOp("shutdown", lambda: self._appController.close(None), "shutdown")
+
+            if cycle % self._args.sample_every == 0:
+                self._sample(cycle)
+        self._endTime = time.perf_counter()
+        if self._samples[-1][0] != self._args.cycles:
+            self._sample(self._args.cycles)
+
+    def _leakedPids(self) -> list:
+        time.sleep(self._args.timeout if self._failures else 0.1)
+        leaked = []
+        for pid in self._pids:
+            try:
+                status = Path("/proc/{0}/status".format(pid)).read_text()
+            except (FileNotFoundError, ProcessLookupError):
+                continue
+            if "\nState:\tZ" not in status:
+                leaked.append(pid)
+        return leaked
+
+    def report(self) -> bool:
+        totalOps = sum(len(latencies) for latencies in self._latencies.values()) + len(self._failures)
+        duration = self._endTime - self._startTime
+        print("Cycles: {0}, operations: {1}, duration: {2:.2f}s".format(self._args.cycles, totalOps, duration))
+        print("Throughput: {0:.1f} ops/s".format(totalOps / duration if duration else 0.0))
+
+        print("Latency (app: time spent in Controller/AppController; end-to-end: until the fake Steam finished):")
+        for kind in self._latencies:
+            for label, latencies in (("app", self._appLatencies[kind]), ("end-to-end", self._latencies[kind])):
+                if not latencies:
+                    continue
+                latencies = sorted(latencies)
+                print("  {0} {1}: n={2} p50={3:.3f}ms p95={4:.3f}ms p99={5:.3f}ms max={6:.3f}ms".format(
+                    kind, label, len(latencies),
+                    percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+                    percentile(latencies, 99) * 1000, latencies[-1] * 1000))
+
+        print("Memory and file descriptors over time:")
+        baseRss = self._samples[0][2]
+        for cycle, when, rss, fdCount in self._samples:
+            print("  cycle {0:>7} t={1:>8.2f}s rss={2:>8.1f}KiB ({3:+.1f}KiB) fds={4}".format(
+                cycle, when - self._startTime, rss / 1024, (rss - baseRss) / 1024, fdCount))
+
+        fdGrowth = self._samples[-1][3] - self._samples[0][3]
+        leakedPids = self._leakedPids()
+        print("Leaked file descriptors: {0}".format(max(fdGrowth, 0)))
+        print("Leaked processes: {0}{1}".format(len(leakedPids), " " + repr(leakedPids) if leakedPids else ""))
+        print("Failures: {0}".format(len(self._failures)))
+        for seq, kind, reason in self._failures[:20]:
+            print("  #{0} {1}: {2}".format(seq, kind, reason))
+        print("UI messages: {0}".format(len(self._ui.messages)))
+        for level, title, message in self._ui.messages[:20]:
+            print("  {0}: {1}: {2}".format(level, title, message))
+
+        return not self._failures and not leakedPids and fdGrowth <= 0 and not self._ui.messages
+
+
+def percentile(sortedValues: list, pct: float) -> float:
+    index = min(len(sortedValues) - 1, int(round(pct / 100 * (len(sortedValues) - 1))))
+    return sortedValues[index]
+
+
+def parseArgs(argv: list):
+    parser = argparse.ArgumentParser(description="Stress test account switching against a fake Steam")
+    parser.add_argument("--cycles", type=int, default=2000, help="number of switch cycles to run")
+    parser.add_argument("--accounts", type=int, default=10, help="number of accounts to switch between")
+    parser.add_argument("--login-delay", type=float, default=0.0, help="seconds the fake Steam takes to log in")
+    parser.add_argument("--shutdown-delay", type=float, default=0.0, help="seconds the fake Steam takes to shut down")
+    parser.add_argument("--shutdown-every", type=int, default=5, help="shut down Steam every N cycles (0 to disable)")
+    parser.add_argument("--sample-every", type=int, default=100, help="sample memory and file descriptors every N cycles")
+    parser.add_argument("--snapshots", action="store_true", help="enable per-account Steam config snapshots")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for each fake Steam invocation")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    args = parseArgs(argv[1:])
+    if args.accounts < 1 or args.cycles < 1 or args.sample_every < 1:
+        print("--accounts, --cycles and --sample-every must be at least 1", file=sys.stderr)
+        return 2
+
+    keyring.set_keyring(MemoryKeyring())
+    app = QApplication(argv)
+
+    with tempfile.TemporaryDirectory(prefix="steamfastlogin-stress-") as workDir:
+        harness = StressHarness(Path(workDir), args)
+        harness.setUp()
+        harness.run()
+        success = harness.report()
+
+    app.quit()
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())